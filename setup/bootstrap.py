@@ -83,10 +83,10 @@ def create_indices():
 
 
 def create_tools():
-    """Register all ES|QL and index search tools via Kibana API."""
+    """Register all ES|QL and index search tools via Kibana API. Returns {name: tool_id}."""
     tools_dir = PROJECT_ROOT / "tools" / "esql"
     client = httpx.Client(timeout=30)
-    created = []
+    created = {}
 
     for tool_file in sorted(tools_dir.glob("*.json")):
         tool_config = json.loads(tool_file.read_text())
@@ -101,11 +101,11 @@ def create_tools():
         if resp.status_code in (200, 201):
             result = resp.json()
             tool_id = result.get("id", tool_config["name"])
-            created.append(tool_id)
+            created[tool_config["name"]] = tool_id
             print(f"     ✅ Created: {tool_id}")
         elif resp.status_code == 409:
             print(f"     ⏭️  Already exists: {tool_config['name']}")
-            created.append(tool_config["name"])
+            created[tool_config["name"]] = tool_config["name"]
         else:
             print(f"     ❌ Failed: {resp.status_code} {resp.text[:200]}")
 
@@ -132,10 +132,10 @@ def create_tools():
             json=tool_config,
         )
         if resp.status_code in (200, 201):
-            created.append(tool_config["name"])
+            created[tool_config["name"]] = tool_config["name"]
             print(f"     ✅ Created: {tool_config['name']}")
         elif resp.status_code == 409:
-            created.append(tool_config["name"])
+            created[tool_config["name"]] = tool_config["name"]
             print(f"     ⏭️  Already exists: {tool_config['name']}")
         else:
             print(f"     ❌ Failed: {resp.status_code} {resp.text[:100]}")
@@ -303,7 +303,8 @@ def main():
     create_indices()
 
     print("\n📋 Step 2: Create ES|QL & Index tools")
-    tool_ids = create_tools()
+    tool_map = create_tools()
+    tool_ids = list(tool_map.values())
     print(f"   Total tools: {len(tool_ids)}")
 
     print("\n📋 Step 3: Create workflow tools")
@@ -336,6 +337,11 @@ def main():
     ids_file.write_text(json.dumps(agents, indent=2))
     print(f"\nAgent IDs saved to: {ids_file}")
 
+    # Tool IDs by name, for services that execute tools directly (incident_scheduler.py)
+    tool_ids_file = PROJECT_ROOT / "setup" / "tool_ids.json"
+    tool_ids_file.write_text(json.dumps(tool_map, indent=2))
+    print(f"Tool IDs saved to: {tool_ids_file}")
+
 
 if __name__ == "__main__":
     main()
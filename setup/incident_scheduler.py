@@ -0,0 +1,656 @@
+#!/usr/bin/env python3
+"""
+DevOps Incident Commander — Incident Scheduler
+Intake service that sits in front of the Commander agent during alert storms.
+
+Incoming alerts are deduplicated and grouped into incidents in two steps:
+alerts for a service that already has an open incident join it, and alerts for
+a new service join an open incident within the correlation window when the
+service_dependency tool links the two (a cascade becomes one incident). Each
+incident is handled by one Commander conversation.
+
+Incidents are queued by severity (P1-P4 from the severity_classifier tool) and
+drained by a bounded pool of concurrent Commander conversations. In-flight
+Commander messages are never cancelled, since the Agent Builder API cannot
+abort a run. Instead a P1 may borrow one slot above the pool limit, and when
+that is taken too, lower-priority incidents yield their slot at the next
+follow-up message: the follow-up alerts are held back and the incident is
+requeued behind the P1. At most INCIDENT_MAX_CONCURRENT + 1 Commander runs are
+ever in flight.
+
+Usage:
+    export KIBANA_URL="https://your-deployment.kb.us-central1.gcp.cloud.es.io"
+    export ELASTIC_API_KEY="your-api-key"
+    export ES_URL="https://your-deployment.es.us-central1.gcp.cloud.es.io"
+    uv run setup/incident_scheduler.py            # poll .alerts-* continuously
+    uv run setup/incident_scheduler.py --once     # poll once, drain, exit
+    uv run setup/incident_scheduler.py --stdin < alerts.ndjson
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+# --- Configuration ---
+KIBANA_URL = os.environ.get("KIBANA_URL", "").rstrip("/")
+ELASTIC_API_KEY = os.environ.get("ELASTIC_API_KEY", "")
+ES_URL = os.environ.get("ES_URL", "").rstrip("/")
+COMMANDER_AGENT_ID = os.environ.get("COMMANDER_AGENT_ID", "")
+
+MAX_CONCURRENT_RUNS = int(os.environ.get("INCIDENT_MAX_CONCURRENT", "3"))
+POLL_INTERVAL = float(os.environ.get("INCIDENT_POLL_INTERVAL", "10"))
+CORRELATION_WINDOW = float(os.environ.get("INCIDENT_CORRELATION_WINDOW", "600"))  # seconds
+SEEN_RETENTION = float(os.environ.get("INCIDENT_SEEN_RETENTION", "3600"))  # seconds, --stdin dedupe
+TOOL_TIMEOUT = float(os.environ.get("INCIDENT_TOOL_TIMEOUT", "10"))  # seconds, intake tool calls
+TOOL_CONCURRENCY = 8  # Parallel intake tool calls while warming a page of alerts
+P1_BURST_SLOTS = 1  # Extra slots only a P1 may use
+MAX_PREEMPTIONS = 2  # Per incident, so a busy P1 stream cannot starve it forever
+MAX_RETRIES = 2  # Per incident, for failed Kibana calls
+MAX_REPLAYS = 1  # Per alert, fresh incidents after one exhausted its retries
+
+HEADERS = {
+    "kbn-xsrf": "true",
+    "Content-Type": "application/json",
+    "Authorization": f"ApiKey {ELASTIC_API_KEY}",
+}
+
+ES_HEADERS = {
+    "Content-Type": "application/json",
+    "Authorization": f"ApiKey {ELASTIC_API_KEY}",
+}
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+SEVERITIES = ("P1", "P2", "P3", "P4")
+DEFAULT_SEVERITY = "P3"
+
+# Used when severity_classifier is unavailable or returns nothing usable
+ALERT_SEVERITY_FALLBACK = {
+    "critical": "P1",
+    "high": "P2",
+    "medium": "P3",
+    "low": "P4",
+}
+
+
+@dataclass
+class Incident:
+    """Correlated alerts across one or more services, handled by one Commander conversation."""
+
+    id: int
+    services: list[str]
+    severity: str
+    last_seen: datetime
+    alerts: list[dict] = field(default_factory=list)
+    delivered: int = 0  # alerts[:delivered] got a completed Commander response
+    conversation_id: str | None = None
+    state: str = "queued"  # queued | running | resolved | failed
+    preemptions: int = 0
+    retries: int = 0
+
+    @property
+    def rank(self) -> tuple[int, int]:
+        """Heap ordering: severity first, then arrival order."""
+        return (SEVERITIES.index(self.severity), self.id)
+
+    @property
+    def label(self) -> str:
+        return ", ".join(self.services)
+
+    @property
+    def is_open(self) -> bool:
+        return self.state in ("queued", "running")
+
+
+def get_field(doc: dict, path: str):
+    """Read a dotted field from either a flat or a nested _source document."""
+    if path in doc:
+        return doc[path]
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def parse_timestamp(value) -> datetime | None:
+    """Parse an ISO-8601 @timestamp; naive values are treated as UTC."""
+    if not isinstance(value, str):
+        return None
+    try:
+        ts = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def alert_fingerprint(alert: dict) -> str:
+    """Stable identity for an alert so re-polled or re-sent alerts are dropped."""
+    alert_id = alert.get("_id") or get_field(alert, "kibana.alert.uuid")
+    if alert_id:
+        return str(alert_id)
+    return "|".join(
+        str(get_field(alert, key) or "")
+        for key in ("service.name", "kibana.alert.rule.name", "@timestamp")
+    )
+
+
+def extract_column(payload, column: str) -> list | None:
+    """Collect one column from the first tabular (columns/values) block in a tool response."""
+    if isinstance(payload, dict):
+        columns = payload.get("columns")
+        values = payload.get("values")
+        if isinstance(columns, list) and isinstance(values, list):
+            names = [c.get("name") if isinstance(c, dict) else c for c in columns]
+            if column in names:
+                index = names.index(column)
+                return [row[index] for row in values if isinstance(row, list) and len(row) > index]
+        children = payload.values()
+    elif isinstance(payload, list):
+        children = payload
+    else:
+        return None
+
+    for child in children:
+        found = extract_column(child, column)
+        if found is not None:
+            return found
+    return None
+
+
+def extract_severity(payload) -> str | None:
+    """Find a P1-P4 value in a tool execution response (tabular or keyed)."""
+    if isinstance(payload, dict) and payload.get("severity") in SEVERITIES:
+        return payload["severity"]
+    for value in extract_column(payload, "severity") or []:
+        if value in SEVERITIES:
+            return value
+    if isinstance(payload, dict):
+        children = payload.values()
+    elif isinstance(payload, list):
+        children = payload
+    else:
+        return None
+    for child in children:
+        if isinstance(child, (dict, list)):
+            found = extract_severity(child)
+            if found:
+                return found
+    return None
+
+
+def format_alerts(alerts: list[dict]) -> str:
+    """Render alerts as bullet lines for a Commander message."""
+    lines = []
+    for alert in alerts:
+        rule = get_field(alert, "kibana.alert.rule.name") or "Unknown rule"
+        service = get_field(alert, "service.name") or "unknown-service"
+        ts = get_field(alert, "@timestamp") or "unknown time"
+        level = get_field(alert, "kibana.alert.severity")
+        suffix = f" (alert severity: {level})" if level else ""
+        lines.append(f"- {ts} {rule} on {service}{suffix}")
+    return "\n".join(lines)
+
+
+class IncidentScheduler:
+    """Priority queue of incidents drained by a bounded pool of Commander runs."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        commander_id: str,
+        max_concurrent: int,
+        tool_ids: dict[str, str] | None = None,
+    ):
+        self.client = client
+        self.commander_id = commander_id
+        self.max_concurrent = max(1, max_concurrent)
+        self.tool_ids = tool_ids or {}
+        self.seen: dict[str, datetime] = {}  # fingerprint -> alert @timestamp (or arrival)
+        self.latest: datetime | None = None  # newest alert timestamp submitted
+        self.open: dict[str, Incident] = {}  # member service -> queued/running incident
+        self.queue: list[tuple[tuple[int, int], Incident]] = []
+        self.running: dict[int, asyncio.Task] = {}
+        self.tool_cache: dict[tuple[str, str], tuple[float, dict]] = {}
+        self.replays: dict[str, int] = {}  # fingerprint -> times released after a failure
+        self.released: list[dict] = []  # alerts to resubmit after their incident failed
+        self.wakeup = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self._ids = itertools.count(1)
+
+    async def submit(self, alert: dict):
+        """Deduplicate an alert and attach it to a new or existing incident."""
+        fingerprint = alert_fingerprint(alert)
+        if fingerprint in self.seen:
+            return
+        alert_time = parse_timestamp(get_field(alert, "@timestamp")) or datetime.now(timezone.utc)
+        self.seen[fingerprint] = alert_time
+        self.latest = max(self.latest or alert_time, alert_time)
+
+        service = get_field(alert, "service.name") or "unknown-service"
+        incident = self.open.get(service)
+        if incident and incident.is_open:
+            self.attach(incident, alert, alert_time)
+            print(f"  🔗 Coalesced alert into incident #{incident.id} ({service}, {incident.state})")
+            return
+
+        severity, incident = await asyncio.gather(
+            self.classify(service, alert),
+            self.correlate(service, alert_time),
+        )
+        if incident:
+            incident.services.append(service)
+            self.open[service] = incident
+            self.attach(incident, alert, alert_time)
+            print(f"  🔗 Correlated {service} into incident #{incident.id} ({incident.label})")
+            if SEVERITIES.index(severity) < SEVERITIES.index(incident.severity):
+                self.escalate(incident, severity)
+            return
+
+        incident = Incident(
+            id=next(self._ids),
+            services=[service],
+            severity=severity,
+            last_seen=alert_time,
+            alerts=[alert],
+        )
+        self.open[service] = incident
+        self.enqueue(incident)
+        print(f"  📥 Queued incident #{incident.id}: {service} [{severity}]")
+
+    async def prefetch(self, alerts: list[dict]):
+        """Warm the tool cache for a page of alerts concurrently, so intake is not serial."""
+        services = {
+            get_field(alert, "service.name") or "unknown-service"
+            for alert in alerts
+            if alert_fingerprint(alert) not in self.seen
+        } - set(self.open)
+        limit = asyncio.Semaphore(TOOL_CONCURRENCY)
+
+        async def warm(service: str):
+            async with limit:
+                await asyncio.gather(
+                    self.tool_result("severity_classifier", service, POLL_INTERVAL),
+                    self.related_services(service),
+                )
+
+        await asyncio.gather(*(warm(service) for service in services))
+
+    def attach(self, incident: Incident, alert: dict, alert_time: datetime):
+        """Add an alert to an open incident; a running incident picks it up as a follow-up."""
+        incident.alerts.append(alert)
+        incident.last_seen = max(incident.last_seen, alert_time)
+
+    def enqueue(self, incident: Incident):
+        incident.state = "queued"
+        heapq.heappush(self.queue, (incident.rank, incident))
+        self.idle.clear()
+        self.wakeup.set()
+
+    def escalate(self, incident: Incident, severity: str):
+        """Raise an incident's severity after a more severe service joined it."""
+        print(f"  ⬆️  Incident #{incident.id} escalated {incident.severity} → {severity}")
+        incident.severity = severity
+        if incident.state == "queued":
+            self.queue = [(queued.rank, queued) for _, queued in self.queue]
+            heapq.heapify(self.queue)
+            self.wakeup.set()
+
+    async def correlate(self, service: str, alert_time: datetime) -> Incident | None:
+        """Find an open incident in the correlation window that shares a dependency edge."""
+        candidates = {
+            incident.id: incident
+            for incident in self.open.values()
+            if incident.is_open
+            and abs((alert_time - incident.last_seen).total_seconds()) <= CORRELATION_WINDOW
+        }
+        if not candidates:
+            return None
+
+        names = sorted({service} | {member for incident in candidates.values() for member in incident.services})
+        related = dict(zip(names, await asyncio.gather(*(self.related_services(name) for name in names))))
+        for incident in sorted(candidates.values(), key=lambda incident: incident.rank):
+            # The incident may have finished while dependencies were looked up
+            if incident.is_open and any(
+                member in related[service] or service in related[member]
+                for member in incident.services
+                if member in related
+            ):
+                return incident
+        return None
+
+    async def related_services(self, service: str) -> set[str]:
+        """Unhealthy downstream services of a service, from the service_dependency tool."""
+        payload = await self.tool_result("service_dependency", service, CORRELATION_WINDOW)
+        targets = extract_column(payload, "service.target.name") or []
+        return {target for target in targets if target}
+
+    async def classify(self, service: str, alert: dict) -> str:
+        """Run severity_classifier for the service, falling back to the alert's own severity."""
+        severity = extract_severity(await self.tool_result("severity_classifier", service, POLL_INTERVAL))
+        if severity:
+            return severity
+
+        level = str(get_field(alert, "kibana.alert.severity") or "").lower()
+        severity = ALERT_SEVERITY_FALLBACK.get(level, DEFAULT_SEVERITY)
+        print(f"  ⚠️  No classifier result for {service} — using {severity} from alert severity '{level or 'none'}'")
+        return severity
+
+    async def tool_result(self, name: str, service: str, ttl: float):
+        """Per-service tool result, cached for ttl seconds; failures are not cached."""
+        key = (name, service)
+        cached = self.tool_cache.get(key)
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+        payload = await self.execute_tool(name, {"service_name": service})
+        if payload is not None:
+            self.tool_cache[key] = (time.monotonic(), payload)
+        return payload
+
+    async def execute_tool(self, name: str, params: dict):
+        """Execute an Agent Builder tool by name; returns the response JSON or None."""
+        try:
+            resp = await self.client.post(
+                f"{KIBANA_URL}/api/agent_builder/tools/_execute",
+                headers=HEADERS,
+                json={"tool_id": self.tool_ids.get(name, name), "tool_params": params},
+                timeout=TOOL_TIMEOUT,
+            )
+            if resp.status_code in (200, 201):
+                return resp.json()
+            print(f"  ⚠️  {name} failed: {resp.status_code} {resp.text[:200]}")
+        except httpx.HTTPError as exc:
+            print(f"  ⚠️  {name} error: {exc}")
+        return None
+
+    def slot_limit(self, incident: Incident) -> int:
+        return self.max_concurrent + (P1_BURST_SLOTS if incident.severity == "P1" else 0)
+
+    def should_yield(self, incident: Incident) -> bool:
+        """True when a queued P1 cannot start until a lower-priority incident gives up its slot."""
+        if incident.severity == "P1" or incident.preemptions >= MAX_PREEMPTIONS or not self.queue:
+            return False
+        _, head = self.queue[0]
+        return head.severity == "P1" and len(self.running) >= self.slot_limit(head)
+
+    async def dispatch(self):
+        """Start queued incidents whenever a slot is free."""
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.queue and len(self.running) < self.slot_limit(self.queue[0][1]):
+                _, incident = heapq.heappop(self.queue)
+                incident.state = "running"
+                task = asyncio.create_task(self.run(incident))
+                task.add_done_callback(lambda task, incident=incident: self.finish(incident, task))
+                self.running[incident.id] = task
+
+    def finish(self, incident: Incident, task: asyncio.Task):
+        """Release the slot; requeue yielded or failed incidents."""
+        self.running.pop(incident.id, None)
+        if task.cancelled():
+            pass  # Only happens on shutdown
+        elif task.exception():
+            incident.retries += 1
+            if incident.retries <= MAX_RETRIES:
+                print(f"  ⚠️  Incident #{incident.id} failed ({task.exception()}), retry {incident.retries}/{MAX_RETRIES}")
+                self.enqueue(incident)
+            else:
+                print(f"  ❌ Incident #{incident.id} failed after {MAX_RETRIES} retries: {task.exception()}")
+                incident.state = "failed"
+                self.close(incident)
+                self.release(incident.alerts[incident.delivered:])
+        elif not task.result():
+            self.enqueue(incident)
+
+        self.wakeup.set()
+        if not self.queue and not self.running:
+            self.idle.set()
+
+    def release(self, alerts: list[dict]):
+        """Hand undelivered alerts back to intake for a fresh incident, or drop them loudly."""
+        for alert in alerts:
+            fingerprint = alert_fingerprint(alert)
+            self.seen.pop(fingerprint, None)
+            self.replays[fingerprint] = self.replays.get(fingerprint, 0) + 1
+            if self.replays[fingerprint] <= MAX_REPLAYS:
+                self.released.append(alert)
+            else:
+                del self.replays[fingerprint]
+                print(f"  ❌ Dropping alert {fingerprint} after {MAX_REPLAYS} replay(s)")
+
+    def take_released(self) -> list[dict]:
+        released, self.released = self.released, []
+        return released
+
+    def close(self, incident: Incident):
+        """Stop routing new alerts to an incident."""
+        for service in incident.services:
+            if self.open.get(service) is incident:
+                del self.open[service]
+
+    def expire(self, before: datetime):
+        """Forget fingerprints of alerts older than `before`; they will not be submitted again."""
+        for fingerprint, ts in list(self.seen.items()):
+            if ts < before:
+                del self.seen[fingerprint]
+
+    async def drain(self):
+        """Wait until every queued and running incident has finished."""
+        await self.idle.wait()
+
+    async def run(self, incident: Incident) -> bool:
+        """Drive one incident through a Commander conversation; False if it yielded to a P1."""
+        if not incident.conversation_id:
+            resp = await self.client.post(
+                f"{KIBANA_URL}/api/agent_builder/conversations",
+                headers=HEADERS,
+                json={
+                    "agent_id": self.commander_id,
+                    "title": f"[{incident.severity}] {incident.label} (incident #{incident.id})",
+                },
+            )
+            resp.raise_for_status()
+            incident.conversation_id = resp.json().get("id")
+
+        print(f"  🤖 Running incident #{incident.id}: {incident.label} [{incident.severity}]")
+        # Alerts that arrive mid-run go to the same conversation as one batch
+        while incident.delivered < len(incident.alerts):
+            batch = incident.alerts[incident.delivered:]
+            if incident.delivered and self.should_yield(incident):
+                incident.preemptions += 1
+                print(f"  ⏸️  Incident #{incident.id} yields to a waiting P1 ({len(batch)} follow-up alert(s) held)")
+                return False
+            if incident.delivered == 0:
+                intro = f"Pre-classified {incident.severity} incident affecting {incident.label}. Alerts:"
+            else:
+                print(f"  ➕ Follow-up for incident #{incident.id}: {len(batch)} new alert(s)")
+                intro = f"Additional alerts for this incident ({incident.label}) since the last update:"
+            await self.send(incident, len(batch), f"{intro}\n{format_alerts(batch)}")
+
+        # No await between the last check and close, so no alert can slip in
+        incident.state = "resolved"
+        self.close(incident)
+        print(f"  ✅ Incident #{incident.id} handled ({len(incident.alerts)} alerts, 1 conversation)")
+        return True
+
+    async def send(self, incident: Incident, count: int, message: str):
+        """Post a message to the incident's Commander conversation and wait for the response."""
+        resp = await self.client.post(
+            f"{KIBANA_URL}/api/agent_builder/conversations/{incident.conversation_id}/messages",
+            headers=HEADERS,
+            json={"message": message},
+        )
+        resp.raise_for_status()
+        for alert in incident.alerts[incident.delivered:incident.delivered + count]:
+            self.replays.pop(alert_fingerprint(alert), None)
+        incident.delivered += count
+
+
+async def search_alerts(client: httpx.AsyncClient, filters: list[dict]) -> list[dict] | None:
+    """Active alerts from .alerts-* matching extra filters, oldest first; None on failure."""
+    try:
+        resp = await client.post(
+            f"{ES_URL}/.alerts-*/_search",
+            headers=ES_HEADERS,
+            json={
+                "size": 500,
+                "sort": [{"@timestamp": "asc"}],
+                "query": {"bool": {"filter": [{"term": {"kibana.alert.status": "active"}}, *filters]}},
+            },
+        )
+        if resp.status_code == 200:
+            return [{"_id": hit["_id"], **hit["_source"]} for hit in resp.json().get("hits", {}).get("hits", [])]
+        print(f"  ❌ Alert poll failed: {resp.status_code} {resp.text[:200]}")
+    except httpx.HTTPError as exc:
+        print(f"  ❌ Alert poll error: {exc}")
+    return None
+
+
+async def poll_alerts(client: httpx.AsyncClient, scheduler: IncidentScheduler, once: bool):
+    """Feed active alerts from .alerts-* into the scheduler."""
+    cursor = None
+    while True:
+        # Re-fetch alerts released by failed incidents; they are behind the cursor
+        released = scheduler.take_released()
+        ids = [alert["_id"] for alert in released if alert.get("_id")]
+        alerts = await search_alerts(client, [{"ids": {"values": ids}}]) if ids else []
+        if alerts is None:
+            scheduler.released.extend(released)  # Try again on the next poll
+
+        new_alerts = await search_alerts(
+            client, [{"range": {"@timestamp": {"gte": cursor}}}] if cursor else []
+        )
+        if new_alerts is not None:
+            alerts = (alerts or []) + new_alerts
+            cursor = next(
+                (get_field(alert, "@timestamp") for alert in reversed(new_alerts) if get_field(alert, "@timestamp")),
+                cursor,
+            )
+
+        await scheduler.prefetch(alerts or [])
+        for alert in alerts or []:
+            await scheduler.submit(alert)
+        if parse_timestamp(cursor):
+            scheduler.expire(parse_timestamp(cursor))
+
+        if once:
+            await scheduler.drain()
+            if not scheduler.released:
+                return
+            continue
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def read_stdin_alerts(scheduler: IncidentScheduler):
+    """Feed NDJSON alerts from stdin into the scheduler."""
+    while True:
+        line = await asyncio.to_thread(sys.stdin.readline)
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            alert = json.loads(line)
+        except json.JSONDecodeError as exc:
+            print(f"  ❌ Skipping malformed alert line: {exc}")
+            continue
+        if not isinstance(alert, dict):
+            print("  ❌ Skipping alert line that is not a JSON object")
+            continue
+
+        await scheduler.submit(alert)
+        # Nothing can re-read stdin, so released alerts are resubmitted from memory
+        for released in scheduler.take_released():
+            await scheduler.submit(released)
+        if scheduler.latest:
+            scheduler.expire(scheduler.latest - timedelta(seconds=SEEN_RETENTION))
+
+    while True:
+        await scheduler.drain()
+        released = scheduler.take_released()
+        if not released:
+            return
+        for alert in released:
+            await scheduler.submit(alert)
+
+
+
+def load_commander_id() -> str:
+    """Commander agent ID from the environment or bootstrap's agent_ids.json."""
+    if COMMANDER_AGENT_ID:
+        return COMMANDER_AGENT_ID
+    ids_file = PROJECT_ROOT / "setup" / "agent_ids.json"
+    if ids_file.exists():
+        return json.loads(ids_file.read_text()).get("commander", "")
+    return ""
+
+
+def load_tool_ids() -> dict[str, str]:
+    """Tool IDs by name from bootstrap's tool_ids.json (names are used when absent)."""
+    ids_file = PROJECT_ROOT / "setup" / "tool_ids.json"
+    if ids_file.exists():
+        return json.loads(ids_file.read_text())
+    return {}
+
+
+async def serve(args: argparse.Namespace, commander_id: str):
+    async with httpx.AsyncClient(timeout=300) as client:
+        scheduler = IncidentScheduler(client, commander_id, args.max_concurrent, load_tool_ids())
+        dispatcher = asyncio.create_task(scheduler.dispatch())
+
+        if args.stdin:
+            await read_stdin_alerts(scheduler)
+        else:
+            await poll_alerts(client, scheduler, args.once)
+
+        await scheduler.drain()
+        dispatcher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Priority-aware incident scheduler for the Commander agent")
+    parser.add_argument("--stdin", action="store_true", help="Read NDJSON alerts from stdin instead of polling .alerts-*")
+    parser.add_argument("--once", action="store_true", help="Poll .alerts-* once, drain the queue, and exit")
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        default=MAX_CONCURRENT_RUNS,
+        help=f"Maximum concurrent Commander conversations (default: {MAX_CONCURRENT_RUNS})",
+    )
+    args = parser.parse_args()
+
+    missing = [name for name, value in (("KIBANA_URL", KIBANA_URL), ("ELASTIC_API_KEY", ELASTIC_API_KEY)) if not value]
+    if not args.stdin and not ES_URL:
+        missing.append("ES_URL")
+    if missing:
+        print(f"❌ Missing environment variables: {', '.join(missing)}")
+        sys.exit(1)
+
+    commander_id = load_commander_id()
+    if not commander_id:
+        print("❌ Commander agent ID not found. Run setup/bootstrap.py or set COMMANDER_AGENT_ID.")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("🚦 Incident Scheduler")
+    print(f"   Commander: {commander_id} | Max concurrent runs: {args.max_concurrent}")
+    print("=" * 60)
+    asyncio.run(serve(args, commander_id))
+
+
+if __name__ == "__main__":
+    main()
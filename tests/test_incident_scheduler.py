@@ -0,0 +1,386 @@
+import asyncio
+import io
+
+import httpx
+
+import incident_scheduler
+from incident_scheduler import IncidentScheduler
+
+
+class StubClient:
+    """Stands in for httpx.AsyncClient, answering the Agent Builder calls the scheduler makes."""
+
+    def __init__(self, severities=None, dependencies=None, message_failures=0, dependency_failures=0, index=None):
+        self.severities = severities or {}
+        self.dependencies = dependencies or {}
+        self.message_failures = message_failures
+        self.dependency_failures = dependency_failures
+        self.index = index or []  # .alerts-* documents for _search
+        self.tool_calls = []
+        self.conversations = []
+        self.messages = []
+        self.release = asyncio.Event()
+        self.release.set()
+        self.gates = {}  # conversation id -> Event its messages wait on
+
+    async def post(self, url, headers=None, json=None, timeout=None):
+        request = httpx.Request("POST", url)
+        if url.endswith("/_search"):
+            filters = json["query"]["bool"]["filter"]
+            ids = next((f["ids"]["values"] for f in filters if "ids" in f), None)
+            hits = [
+                {"_id": doc["_id"], "_source": {k: v for k, v in doc.items() if k != "_id"}}
+                for doc in self.index
+                if ids is None or doc["_id"] in ids
+            ]
+            return httpx.Response(200, json={"hits": {"hits": hits}}, request=request)
+
+        if url.endswith("/tools/_execute"):
+            self.tool_calls.append(json)
+            service = json["tool_params"]["service_name"]
+            if json["tool_id"].endswith("severity_classifier"):
+                if service not in self.severities:
+                    return httpx.Response(500, request=request)
+                columns, values = ["severity"], [[self.severities[service]]]
+            elif self.dependency_failures:
+                self.dependency_failures -= 1
+                return httpx.Response(503, request=request)
+            else:
+                columns, values = ["service.target.name"], [[t] for t in self.dependencies.get(service, [])]
+            data = {"columns": [{"name": c} for c in columns], "values": values}
+            return httpx.Response(200, json={"results": [{"data": data}]}, request=request)
+
+        if url.endswith("/conversations"):
+            conversation_id = f"c{len(self.conversations) + 1}"
+            self.conversations.append(json["title"])
+            return httpx.Response(200, json={"id": conversation_id}, request=request)
+
+        # Recorded on entry, before the (possibly gated) Commander response
+        conversation_id = url.split("/conversations/")[1].split("/")[0]
+        self.messages.append((conversation_id, json["message"]))
+        await self.release.wait()
+        if conversation_id in self.gates:
+            await self.gates[conversation_id].wait()
+        if self.message_failures:
+            self.message_failures -= 1
+            return httpx.Response(503, request=request)
+        return httpx.Response(200, json={}, request=request)
+
+
+def alert(service, rule="Error Rate Spike", ts="2026-01-01T00:00:00+00:00", **extra):
+    return {"service.name": service, "kibana.alert.rule.name": rule, "@timestamp": ts, **extra}
+
+
+def run_scenario(scenario, client, max_concurrent=3):
+    async def main():
+        scheduler = IncidentScheduler(client, "commander", max_concurrent)
+        dispatcher = asyncio.create_task(scheduler.dispatch())
+        try:
+            await scenario(scheduler)
+            await asyncio.wait_for(scheduler.drain(), timeout=5)
+        finally:
+            dispatcher.cancel()
+        return scheduler
+
+    return asyncio.run(main())
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_duplicate_alerts_are_dropped():
+    client = StubClient(severities={"payment-service": "P2"})
+    first = alert("payment-service", _id="a1")
+
+    async def scenario(scheduler):
+        await scheduler.submit(first)
+        await scheduler.submit(dict(first))
+
+    run_scenario(scenario, client)
+    assert len(client.conversations) == 1
+    assert len(client.messages) == 1
+    assert client.messages[0][1].count("Error Rate Spike") == 1
+
+
+def test_alerts_coalesce_into_queued_incident():
+    client = StubClient(severities={"user-service": "P2", "payment-service": "P2"})
+    client.release.clear()
+
+    async def scenario(scheduler):
+        await scheduler.submit(alert("user-service", "Memory Usage Critical"))
+        await settle()
+        await scheduler.submit(alert("payment-service", "High CPU Usage"))
+        await scheduler.submit(alert("payment-service", "Slow Transactions"))
+        assert scheduler.open["payment-service"].state == "queued"
+        client.release.set()
+
+    run_scenario(scenario, client, max_concurrent=1)
+    assert len(client.conversations) == 2
+    payment_messages = [message for conv, message in client.messages if conv == "c2"]
+    assert len(payment_messages) == 1
+    assert "High CPU Usage" in payment_messages[0] and "Slow Transactions" in payment_messages[0]
+
+
+def test_alerts_for_running_incident_are_sent_as_follow_up():
+    client = StubClient(severities={"payment-service": "P2"})
+    client.release.clear()
+
+    async def scenario(scheduler):
+        await scheduler.submit(alert("payment-service", "High CPU Usage"))
+        await settle()
+        await scheduler.submit(alert("payment-service", "Slow Transactions"))
+        client.release.set()
+
+    run_scenario(scenario, client)
+    assert len(client.conversations) == 1
+    assert [conv for conv, _ in client.messages] == ["c1", "c1"]
+    assert client.messages[1][1].startswith("Additional alerts")
+    assert "Slow Transactions" in client.messages[1][1]
+    assert "High CPU Usage" not in client.messages[1][1]
+
+
+def test_cascade_becomes_one_incident():
+    cascade = ["inventory-service", "order-service", "gateway-service", "payment-service"]
+    client = StubClient(
+        severities={service: "P2" for service in cascade},
+        dependencies={
+            "inventory-service": ["inventory-db"],
+            "order-service": ["inventory-service"],
+            "gateway-service": ["inventory-service"],
+            "payment-service": ["inventory-service"],
+        },
+    )
+    client.release.clear()
+
+    async def scenario(scheduler):
+        for minute, service in zip((45, 48, 50, 52), cascade):
+            await scheduler.submit(alert(service, ts=f"2026-01-01T00:{minute}:00+00:00"))
+            await settle()
+        client.release.set()
+
+    run_scenario(scenario, client)
+    assert len(client.conversations) == 1
+    delivered = "\n".join(message for _, message in client.messages)
+    assert all(service in delivered for service in cascade)
+
+
+def test_unrelated_services_are_separate_incidents():
+    client = StubClient(severities={"user-service": "P2", "payment-service": "P2"})
+    client.release.clear()
+
+    async def scenario(scheduler):
+        await scheduler.submit(alert("user-service"))
+        await settle()
+        await scheduler.submit(alert("payment-service"))
+        client.release.set()
+
+    run_scenario(scenario, client)
+    assert len(client.conversations) == 2
+
+
+def test_p1_borrows_burst_slot_without_cancelling():
+    client = StubClient(severities={"user-service": "P3", "gateway-service": "P1"})
+    client.release.clear()
+    seen = {}
+
+    async def scenario(scheduler):
+        await scheduler.submit(alert("user-service"))
+        await settle()
+        seen["running"] = scheduler.open["user-service"]
+        await scheduler.submit(alert("gateway-service"))
+        await settle()
+        assert scheduler.open["gateway-service"].state == "running"
+        assert seen["running"].state == "running"
+        assert len(scheduler.running) == 1 + incident_scheduler.P1_BURST_SLOTS
+        client.release.set()
+
+    run_scenario(scenario, client, max_concurrent=1)
+    assert seen["running"].preemptions == 0
+    assert seen["running"].state == "resolved"
+    assert [conv for conv, _ in client.messages] == ["c1", "c2"]
+
+
+def yield_scenario(client, seen):
+    """Full pool plus burst slot, a second P1 waiting, and a follow-up for the P3 run."""
+
+    async def scenario(scheduler):
+        client.gates = {"c1": asyncio.Event(), "c2": asyncio.Event()}
+        await scheduler.submit(alert("user-service", "Memory Usage Critical"))
+        await settle()
+        seen["victim"] = victim = scheduler.open["user-service"]
+        victim.preemptions = seen.get("preemptions", 0)
+        await scheduler.submit(alert("gateway-service"))
+        await scheduler.submit(alert("payment-service"))
+        await settle()
+        assert scheduler.open["payment-service"].state == "queued"
+        await scheduler.submit(alert("user-service", "Container restarted"))
+        client.gates["c1"].set()
+        await settle()
+        seen["victim_state"] = victim.state
+        client.gates["c2"].set()
+
+    return scenario
+
+
+def test_running_incident_yields_follow_up_to_waiting_p1():
+    client = StubClient(severities={"user-service": "P3", "gateway-service": "P1", "payment-service": "P1"})
+    seen = {}
+
+    run_scenario(yield_scenario(client, seen), client, max_concurrent=1)
+    victim = seen["victim"]
+    assert seen["victim_state"] == "queued"
+    assert victim.preemptions == 1
+    assert victim.state == "resolved"
+    convs = [conv for conv, _ in client.messages]
+    # The held follow-up goes to the same conversation, after the waiting P1 started
+    assert convs.index("c3") < len(convs) - 1 - convs[::-1].index("c1")
+    victim_messages = [message for conv, message in client.messages if conv == "c1"]
+    assert len(victim_messages) == 2
+    assert victim_messages[1].startswith("Additional alerts") and "Container restarted" in victim_messages[1]
+
+
+def test_preemption_cap():
+    client = StubClient(severities={"user-service": "P3", "gateway-service": "P1", "payment-service": "P1"})
+    seen = {"preemptions": incident_scheduler.MAX_PREEMPTIONS}
+
+    run_scenario(yield_scenario(client, seen), client, max_concurrent=1)
+    assert seen["victim_state"] == "resolved"  # Sent its follow-up instead of yielding
+    assert seen["victim"].preemptions == incident_scheduler.MAX_PREEMPTIONS
+    convs = [conv for conv, _ in client.messages]
+    assert convs.index("c3") > 2  # P1 waited for the follow-up to c1
+
+
+def test_alert_after_run_finishes_opens_new_incident():
+    client = StubClient(severities={"payment-service": "P2"})
+
+    async def main():
+        # No dispatcher: run() is driven directly so finish() never fires
+        scheduler = IncidentScheduler(client, "commander", 1)
+        await scheduler.submit(alert("payment-service", "High CPU Usage"))
+        _, first = scheduler.queue.pop()
+        first.state = "running"
+        await scheduler.run(first)
+        assert first.state == "resolved"
+
+        await scheduler.submit(alert("payment-service", "Slow Transactions"))
+        second = scheduler.open["payment-service"]
+        assert second is not first
+        assert second.state == "queued"
+        assert len(first.alerts) == 1
+
+    asyncio.run(main())
+
+
+def test_failed_run_is_retried():
+    client = StubClient(severities={"payment-service": "P2"}, message_failures=1)
+
+    async def scenario(scheduler):
+        await scheduler.submit(alert("payment-service"))
+
+    run_scenario(scenario, client)
+    assert len(client.conversations) == 1
+    assert len(client.messages) == 2
+    assert all(message.startswith("Pre-classified") for _, message in client.messages)
+
+
+def test_poll_replays_alerts_from_failed_incident():
+    attempts = incident_scheduler.MAX_RETRIES + 1
+    client = StubClient(
+        severities={"payment-service": "P2"},
+        message_failures=attempts,
+        index=[alert("payment-service", _id="a1")],
+    )
+
+    async def scenario(scheduler):
+        await incident_scheduler.poll_alerts(client, scheduler, once=True)
+
+    scheduler = run_scenario(scenario, client)
+    assert len(client.conversations) == 2
+    assert len(client.messages) == attempts + 1
+    assert client.message_failures == 0
+    assert scheduler.replays == {}
+
+
+def test_poll_drops_alert_after_replays_exhausted():
+    attempts = incident_scheduler.MAX_RETRIES + 1
+    client = StubClient(
+        severities={"payment-service": "P2"},
+        message_failures=1000,
+        index=[alert("payment-service", _id="a1")],
+    )
+
+    async def scenario(scheduler):
+        await incident_scheduler.poll_alerts(client, scheduler, once=True)
+
+    scheduler = run_scenario(scenario, client)
+    assert len(client.messages) == attempts * (incident_scheduler.MAX_REPLAYS + 1)
+    assert scheduler.released == [] and scheduler.replays == {}
+
+
+def test_stdin_skips_malformed_lines(monkeypatch):
+    client = StubClient(severities={"payment-service": "P2"})
+    lines = 'not json\n[1, 2]\n{"service.name": "payment-service", "kibana.alert.rule.name": "High CPU Usage"}\n'
+    monkeypatch.setattr(incident_scheduler.sys, "stdin", io.StringIO(lines))
+
+    async def scenario(scheduler):
+        await incident_scheduler.read_stdin_alerts(scheduler)
+
+    run_scenario(scenario, client)
+    assert len(client.messages) == 1
+    assert "High CPU Usage" in client.messages[0][1]
+
+
+def test_dependency_failures_are_not_cached():
+    client = StubClient(dependencies={"order-service": ["inventory-service"]}, dependency_failures=1)
+
+    async def main():
+        scheduler = IncidentScheduler(client, "commander", 1)
+        first = await scheduler.related_services("order-service")
+        second = await scheduler.related_services("order-service")
+        third = await scheduler.related_services("order-service")
+        return first, second, third
+
+    assert asyncio.run(main()) == (set(), {"inventory-service"}, {"inventory-service"})
+    assert len(client.tool_calls) == 2
+
+
+def test_dependency_cache_expires(monkeypatch):
+    monkeypatch.setattr(incident_scheduler, "CORRELATION_WINDOW", 0)
+    client = StubClient(dependencies={"order-service": ["inventory-service"]})
+
+    async def main():
+        scheduler = IncidentScheduler(client, "commander", 1)
+        await scheduler.related_services("order-service")
+        await scheduler.related_services("order-service")
+
+    asyncio.run(main())
+    assert len(client.tool_calls) == 2
+
+
+def test_classifier_uses_execute_api_and_critical_fallback():
+    client = StubClient()
+
+    async def main():
+        scheduler = IncidentScheduler(client, "commander", 1, {"severity_classifier": "tool-123"})
+        severity = await scheduler.classify("payment-service", alert("payment-service", **{"kibana.alert.severity": "critical"}))
+        return severity
+
+    assert asyncio.run(main()) == "P1"
+    assert client.tool_calls == [
+        {"tool_id": "tool-123", "tool_params": {"service_name": "payment-service"}}
+    ]
+
+
+def test_expire_drops_fingerprints_behind_cursor():
+    async def main():
+        scheduler = IncidentScheduler(StubClient(), "commander", 1)
+        scheduler.seen = {
+            "old": incident_scheduler.parse_timestamp("2026-01-01T00:00:00Z"),
+            "current": incident_scheduler.parse_timestamp("2026-01-01T00:10:00Z"),
+        }
+        scheduler.expire(incident_scheduler.parse_timestamp("2026-01-01T00:10:00Z"))
+        return scheduler.seen
+
+    assert list(asyncio.run(main())) == ["current"]